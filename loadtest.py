@@ -0,0 +1,116 @@
+import sys
+import json
+import asyncio
+import argparse
+
+from server import GameServer, HOST, TICK_RATE
+from main import STATE_GAMEOVER
+
+# Spots next to the default path where a stand-in client builds its defence
+TOWER_SPOTS = [(350, 400), (550, 400), (250, 200), (450, 400)]
+MAX_WAVE = 8
+
+
+async def stand_in_client(port, stats):
+    """Plays a session the way an idle-but-busy player would.
+
+    Builds a couple of towers, keeps starting waves and restarts once the
+    base falls or the waves get long, so every session keeps simulating.
+    Only stats lines are parsed; everything else is just counted.
+    """
+    reader, writer = await asyncio.open_connection(HOST, port)
+    for x, y in TOWER_SPOTS[:2]:
+        writer.write(json.dumps({"cmd": "place", "type": "gun", "x": x, "y": y}).encode() + b"\n")
+    writer.write(b'{"cmd":"start_wave"}\n')
+    try:
+        while True:
+            line = await reader.readline()
+            if not line:
+                break
+            stats["bytes"] += len(line)
+            if b'"s":' not in line:
+                continue
+            money, base, wave, score, wave_active, state = json.loads(line)["s"]
+            if state == STATE_GAMEOVER or (wave >= MAX_WAVE and not wave_active):
+                writer.write(b'{"cmd":"reset"}\n')
+                for x, y in TOWER_SPOTS[:2]:
+                    writer.write(json.dumps({"cmd": "place", "type": "gun", "x": x, "y": y}).encode() + b"\n")
+                writer.write(b'{"cmd":"start_wave"}\n')
+            elif not wave_active:
+                writer.write(b'{"cmd":"start_wave"}\n')
+    except asyncio.CancelledError:
+        pass
+    finally:
+        writer.close()
+
+
+async def measure(game_server, stats, seconds):
+    ticks, overruns, busy = game_server.ticks, game_server.overruns, game_server.busy_time
+    received = stats["bytes"]
+    await asyncio.sleep(seconds)
+    ticks = game_server.ticks - ticks
+    return {
+        "rate": ticks / seconds,
+        "overruns": game_server.overruns - overruns,
+        "tick_ms": 1000 * (game_server.busy_time - busy) / max(ticks, 1),
+        "received": stats["bytes"] - received,
+    }
+
+
+async def run(start, max_sessions, warmup, window, tick_rate):
+    game_server = GameServer(tick_rate)
+    server = await asyncio.start_server(game_server.handle_client, HOST, 0)
+    port = server.sockets[0].getsockname()[1]
+    ticker = asyncio.create_task(game_server.run_ticks())
+    stats = {"bytes": 0}
+    clients = []
+    best = None
+
+    print(f"{'sessions':>8} {'tick Hz':>8} {'tick ms':>8} {'overruns':>8} {'KB/s/session':>13}")
+    count = start
+    while count <= max_sessions:
+        while len(clients) < count:
+            clients.append(asyncio.create_task(stand_in_client(port, stats)))
+        await asyncio.sleep(warmup)
+        result = await measure(game_server, stats, window)
+        per_session = result["received"] / window / count / 1024
+        print(f"{count:>8} {result['rate']:>8.1f} {result['tick_ms']:>8.2f} "
+              f"{result['overruns']:>8} {per_session:>13.2f}")
+        # A level is sustained if ticks keep pace and none had to be dropped
+        if result["rate"] < tick_rate * 0.98 or result["overruns"] > 0:
+            break
+        best = (count, per_session, result)
+        count *= 2
+
+    for task in clients:
+        task.cancel()
+    await asyncio.gather(*clients, return_exceptions=True)
+    while game_server.sessions:
+        await asyncio.sleep(0.01)
+    ticker.cancel()
+    server.close()
+    await server.wait_closed()
+
+    if best is None:
+        print(f"Could not sustain {start} sessions at {tick_rate} Hz")
+    else:
+        count, per_session, result = best
+        print(f"Sustained {count} sessions at {tick_rate} Hz on one core "
+              f"(server and stand-in clients share the event loop)")
+        print(f"Bandwidth: {per_session:.2f} KB/s per session "
+              f"({result['received'] / window / count / tick_rate:.0f} bytes per tick)")
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Load test the Tower Defense server")
+    parser.add_argument("--start", type=int, default=8, help="sessions in the first step")
+    parser.add_argument("--max", type=int, default=4096, help="stop doubling past this many sessions")
+    parser.add_argument("--warmup", type=float, default=2.0, help="seconds before each measurement")
+    parser.add_argument("--window", type=float, default=4.0, help="seconds measured per step")
+    parser.add_argument("--tick-rate", type=int, default=TICK_RATE)
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args(sys.argv[1:])
+    asyncio.run(run(args.start, args.max, args.warmup, args.window, args.tick_rate))
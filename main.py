@@ -3,6 +3,10 @@ import sys
 import math
 import random
 import asyncio
+import heapq
+import bisect
+import itertools
+from collections import deque
 
 # Initialize pygame
 pygame.init()
@@ -56,6 +60,21 @@ PATH = [
 ]
 BASE_RECT = pygame.Rect(700, 150, 80, 80)
 
+# Maze mode grid configuration
+MODE_PATH = "path"
+MODE_MAZE = "maze"
+CELL_SIZE = 40
+GRID_TOP = 40
+GRID_COLS = WIDTH // CELL_SIZE
+GRID_ROWS = (HEIGHT - GRID_TOP) // CELL_SIZE
+MAZE_SPAWN = (0, 6)
+MAZE_INF = 10 ** 9
+
+# Tower targeting
+TARGET_MODES = ["first", "last", "strongest", "weakest", "closest"]
+TARGET_LABELS = {"first": "First", "last": "Last", "strongest": "Strong", "weakest": "Weak", "closest": "Close"}
+ENEMY_SEQ = itertools.count()
+
 # Tower configuration
 TOWER_TYPES = {
     "gun": {
@@ -107,10 +126,202 @@ for seg in PATH:
             WAYPOINTS.append((x + w/2, y + i * h / steps))
 
 
+class FlowField:
+    def __init__(self, cols=GRID_COLS, rows=GRID_ROWS, spawn=MAZE_SPAWN):
+        self.cols, self.rows = cols, rows
+        self.spawn = self.index(*spawn)
+        self.goal = self.cell_at(*BASE_RECT.center)
+        self.blocked = set()
+        self.version = 0
+        self.neighbors = []
+        for r in range(rows):
+            for c in range(cols):
+                adj = []
+                for nc, nr in ((c + 1, r), (c - 1, r), (c, r + 1), (c, r - 1)):
+                    if 0 <= nc < cols and 0 <= nr < rows:
+                        adj.append(self.index(nc, nr))
+                self.neighbors.append(adj)
+        self.rebuild()
+
+    def index(self, col, row):
+        return row * self.cols + col
+
+    def cell_at(self, x, y):
+        col = int(x // CELL_SIZE)
+        row = int((y - GRID_TOP) // CELL_SIZE)
+        if 0 <= col < self.cols and 0 <= row < self.rows:
+            return self.index(col, row)
+        return None
+
+    def center(self, cell):
+        row, col = divmod(cell, self.cols)
+        return col * CELL_SIZE + CELL_SIZE / 2, GRID_TOP + row * CELL_SIZE + CELL_SIZE / 2
+
+    def rect(self, cell):
+        row, col = divmod(cell, self.cols)
+        return pygame.Rect(col * CELL_SIZE, GRID_TOP + row * CELL_SIZE, CELL_SIZE, CELL_SIZE)
+
+    def rebuild(self):
+        # Full BFS from the base, only needed when the field is first built
+        self.dist = [MAZE_INF] * (self.cols * self.rows)
+        self.dist[self.goal] = 0
+        queue = deque([self.goal])
+        while queue:
+            v = queue.popleft()
+            for n in self.neighbors[v]:
+                if n not in self.blocked and self.dist[n] == MAZE_INF:
+                    self.dist[n] = self.dist[v] + 1
+                    queue.append(n)
+
+    def next_cell(self, cell):
+        best = cell
+        for n in self.neighbors[cell]:
+            if self.dist[n] < self.dist[best]:
+                best = n
+        return best
+
+    def block(self, cell, keep=(), commit=True):
+        """Block a cell and repair only the distances that depended on it.
+
+        Returns False (leaving the field untouched) if any cell in `keep`
+        would be cut off from the base. With commit=False the change is
+        always rolled back, so the call only answers whether it is legal.
+        """
+        if cell in self.blocked or cell == self.goal:
+            return False
+        dist = self.dist
+        old = {cell: dist[cell]}
+        self.blocked.add(cell)
+        dist[cell] = MAZE_INF
+
+        # Cells whose every shortest route ran through a blocked cell, found level by level
+        affected = []
+        queue = deque(n for n in self.neighbors[cell] if dist[n] == old[cell] + 1)
+        while queue:
+            v = queue.popleft()
+            if v in old:
+                continue
+            d = dist[v]
+            if any(dist[u] == d - 1 for u in self.neighbors[v]):
+                continue
+            old[v] = d
+            dist[v] = MAZE_INF
+            affected.append(v)
+            queue.extend(n for n in self.neighbors[v] if dist[n] == d + 1)
+
+        # Re-seed the affected region from its intact border and relax inside it
+        heap = []
+        for v in affected:
+            best = min(dist[u] for u in self.neighbors[v]) + 1
+            if best < MAZE_INF:
+                dist[v] = best
+                heap.append((best, v))
+        heapq.heapify(heap)
+        while heap:
+            d, v = heapq.heappop(heap)
+            if d > dist[v]:
+                continue
+            for n in self.neighbors[v]:
+                if n in old and n != cell and d + 1 < dist[n]:
+                    dist[n] = d + 1
+                    heapq.heappush(heap, (d + 1, n))
+
+        ok = all(dist[k] < MAZE_INF for k in keep)
+        if not ok or not commit:
+            for v, d in old.items():
+                dist[v] = d
+            self.blocked.discard(cell)
+        else:
+            self.version += 1
+        return ok
+
+
+def to_spans(values):
+    # Merge sorted integers into [lo, hi] runs of consecutive values
+    spans = []
+    for v in values:
+        if spans and spans[-1][1] == v - 1:
+            spans[-1][1] = v
+        else:
+            spans.append([v, v])
+    return spans
+
+
+class OrderedIndex:
+    """Items kept sorted by a unique (value, tiebreak) key for range queries."""
+
+    def __init__(self):
+        self.keys = []
+        self.items = []
+        self.key_of = {}
+
+    def add(self, item, key):
+        pos = bisect.bisect_left(self.keys, key)
+        self.keys.insert(pos, key)
+        self.items.insert(pos, item)
+        self.key_of[item] = key
+
+    def remove(self, item):
+        pos = bisect.bisect_left(self.keys, self.key_of.pop(item))
+        del self.keys[pos]
+        del self.items[pos]
+
+    def update(self, item, key):
+        if self.key_of[item] != key:
+            self.remove(item)
+            self.add(item, key)
+
+    def bounds(self, lo, hi):
+        start = 0 if lo is None else bisect.bisect_left(self.keys, (lo,))
+        end = len(self.keys) if hi is None else bisect.bisect_right(self.keys, (hi, math.inf))
+        return start, end
+
+    def ascending(self, lo=None, hi=None):
+        start, end = self.bounds(lo, hi)
+        for i in range(start, end):
+            yield self.items[i]
+
+    def descending(self, lo=None, hi=None):
+        start, end = self.bounds(lo, hi)
+        for i in range(end - 1, start - 1, -1):
+            yield self.items[i]
+
+
+class EnemyIndex:
+    def __init__(self):
+        self.by_progress = OrderedIndex()
+        self.by_health = OrderedIndex()
+
+    def __len__(self):
+        return len(self.by_progress.items)
+
+    def add(self, enemy):
+        enemy.index = self
+        self.by_progress.add(enemy, (enemy.progress, -enemy.seq))
+        self.by_health.add(enemy, (enemy.health, enemy.seq))
+
+    def remove(self, enemy):
+        enemy.index = None
+        self.by_progress.remove(enemy)
+        self.by_health.remove(enemy)
+
+    def update(self, enemy):
+        self.by_progress.update(enemy, (enemy.progress, -enemy.seq))
+        self.by_health.update(enemy, (enemy.health, enemy.seq))
+
+
 class Enemy:
-    def __init__(self, kind="normal"):
+    def __init__(self, kind="normal", field=None):
         self.kind = kind
-        self.x, self.y = WAYPOINTS[0]
+        self.field = field
+        self.seq = next(ENEMY_SEQ)
+        self.index = None
+        if field is not None:
+            self.cell = field.spawn
+            self.next_cell = field.next_cell(self.cell)
+            self.x, self.y = field.center(self.cell)
+        else:
+            self.x, self.y = WAYPOINTS[0]
         self.waypoint_index = 0
         self.radius = 15
         self.slow_timer = 0
@@ -141,13 +352,31 @@ class Enemy:
             return self.speed_base * self.slow_factor_active
         return self.speed_base
 
+    @property
+    def progress(self):
+        if self.field is not None:
+            return -self.field.dist[self.cell]
+        return self.waypoint_index
+
+    def take_damage(self, amount):
+        self.health -= amount
+        if self.index is not None:
+            self.index.update(self)
+
     def apply_slow(self, factor, duration_frames):
         if self.slow_timer <= 0 or factor < self.slow_factor_active or duration_frames > self.slow_timer:
             self.slow_factor_active = max(0.25, factor)
             self.slow_timer = duration_frames
 
+    def reached_base(self):
+        if self.field is not None:
+            return self.cell == self.field.goal
+        return self.waypoint_index >= len(WAYPOINTS) - 1
+
     def move(self):
-        if self.waypoint_index < len(WAYPOINTS) - 1:
+        if self.field is not None:
+            self.move_on_field()
+        elif self.waypoint_index < len(WAYPOINTS) - 1:
             tx, ty = WAYPOINTS[self.waypoint_index + 1]
             dx, dy = tx - self.x, ty - self.y
             dist = math.hypot(dx, dy)
@@ -167,6 +396,23 @@ class Enemy:
         if self.slow_timer > 0:
             self.slow_timer -= 1
 
+    def move_on_field(self):
+        if self.cell == self.field.goal:
+            return
+        tx, ty = self.field.center(self.next_cell)
+        dx, dy = tx - self.x, ty - self.y
+        dist = math.hypot(dx, dy)
+        spd = self.speed
+
+        if dist < spd:
+            # Every enemy reads the one shared field, so a step costs four lookups
+            self.x, self.y = tx, ty
+            self.cell = self.next_cell
+            self.next_cell = self.field.next_cell(self.cell)
+        elif dist > 0:
+            self.x += spd * dx / dist
+            self.y += spd * dy / dist
+
     def draw(self, surf):
         pygame.draw.circle(surf, self.color, (int(self.x), int(self.y)), self.radius)
         
@@ -219,13 +465,13 @@ class Bullet:
             r = TOWER_TYPES["splash"]["splash_radius"]
             for e in enemies:
                 if math.hypot(e.x - self.x, e.y - self.y) <= r:
-                    e.health -= self.damage
+                    e.take_damage(self.damage)
         elif self.tower_type == "freeze":
             e = self.target
-            e.health -= self.damage
+            e.take_damage(self.damage)
             e.apply_slow(TOWER_TYPES["freeze"]["slow_factor"], TOWER_TYPES["freeze"]["slow_time"])
         else:
-            self.target.health -= self.damage
+            self.target.take_damage(self.damage)
 
     def draw(self, surf):
         color = (ORANGE if self.tower_type == "gun" else 
@@ -235,8 +481,9 @@ class Bullet:
 
 
 class Tower:
-    def __init__(self, x, y, tower_type="gun"):
+    def __init__(self, x, y, tower_type="gun", field=None):
         self.x, self.y = x, y
+        self.field = field
         self.type = tower_type
         cfg = TOWER_TYPES[tower_type]
         self.range = cfg["range"]
@@ -244,23 +491,79 @@ class Tower:
         self.cooldown = 0
         self.level = 1
         self.color = cfg["color"]
+        self.target_mode = "first"
+        self.update_coverage()
+
+    def update_coverage(self):
+        if self.field is not None:
+            # An enemy is never more than a cell from the center of the cell it last entered
+            reach = self.range + CELL_SIZE
+            self.cells = []
+            for c in range(self.field.cols * self.field.rows):
+                cx, cy = self.field.center(c)
+                if math.hypot(cx - self.x, cy - self.y) <= reach:
+                    self.cells.append(c)
+            self.coverage_version = None
+            return
+        # Waypoint index spans whose following leg passes within range; +4 covers a step's overshoot
+        covered = []
+        last = len(WAYPOINTS) - 1
+        for i, (ax, ay) in enumerate(WAYPOINTS):
+            bx, by = WAYPOINTS[min(i + 1, last)]
+            dx, dy = bx - ax, by - ay
+            length_sq = dx * dx + dy * dy
+            t = 0 if length_sq == 0 else max(0, min(1, ((self.x - ax) * dx + (self.y - ay) * dy) / length_sq))
+            if math.hypot(ax + t * dx - self.x, ay + t * dy - self.y) <= self.range + 4:
+                covered.append(i)
+        self.coverage = to_spans(covered)
+
+    def coverage_spans(self):
+        # In the maze, progress is minus the distance to the base, which changes as towers go down
+        if self.field is not None and self.coverage_version != self.field.version:
+            dist = self.field.dist
+            self.coverage = to_spans(sorted({-dist[c] for c in self.cells if dist[c] < MAZE_INF}))
+            self.coverage_version = self.field.version
+        return self.coverage
 
     def in_range(self, enemy):
         return math.hypot(enemy.x - self.x, enemy.y - self.y) <= self.range
 
-    def try_shoot(self, enemies, bullets):
+    def pick_target(self, index):
+        spans = self.coverage_spans()
+        mode = self.target_mode
+        if mode == "first":
+            for lo, hi in reversed(spans):
+                for e in index.by_progress.descending(lo, hi):
+                    if self.in_range(e):
+                        return e
+        elif mode == "last":
+            for lo, hi in spans:
+                for e in index.by_progress.ascending(lo, hi):
+                    if self.in_range(e):
+                        return e
+        elif mode in ("strongest", "weakest"):
+            order = index.by_health.descending() if mode == "strongest" else index.by_health.ascending()
+            for e in order:
+                if self.in_range(e):
+                    return e
+        else:
+            target = None
+            best = self.range
+            for lo, hi in spans:
+                for e in index.by_progress.ascending(lo, hi):
+                    d = math.hypot(e.x - self.x, e.y - self.y)
+                    if d <= best:
+                        best = d
+                        target = e
+            return target
+        return None
+
+    def try_shoot(self, index, bullets):
         if self.cooldown > 0:
             self.cooldown -= 1
             return
             
-        target = None
-        best_idx = -1
-        for e in enemies:
-            if self.in_range(e):
-                if e.waypoint_index > best_idx:
-                    best_idx = e.waypoint_index
-                    target = e
-                    
+        target = self.pick_target(index)
         if target:
             bullets.append(Bullet(self.x, self.y, target, self.type))
             self.cooldown = max(6, self.fire_rate)
@@ -275,6 +578,7 @@ class Tower:
         self.level += 1
         self.range = int(self.range * 1.15)
         self.fire_rate = max(6, int(self.fire_rate * 0.85))
+        self.update_coverage()
         return True
 
     def draw(self, surf, selected=False):
@@ -333,8 +637,12 @@ class Button:
 
 
 class Game:
-    def __init__(self):
+    def __init__(self, mode=MODE_PATH):
         self.state = STATE_MENU
+        self.mode = mode
+        self.field = FlowField() if mode == MODE_MAZE else None
+        self.index = EnemyIndex()
+        self.target_buttons = []
         self.enemies = []
         self.towers = []
         self.bullets = []
@@ -353,8 +661,15 @@ class Game:
         
     def draw_background(self):
         WIN.fill(GREEN)
-        for seg in PATH:
-            pygame.draw.rect(WIN, GRAY, seg)
+        if self.field is not None:
+            for x in range(0, WIDTH, CELL_SIZE):
+                pygame.draw.line(WIN, (28, 150, 64), (x, GRID_TOP), (x, HEIGHT))
+            for y in range(GRID_TOP, HEIGHT, CELL_SIZE):
+                pygame.draw.line(WIN, (28, 150, 64), (0, y), (WIDTH, y))
+            pygame.draw.rect(WIN, GRAY, self.field.rect(self.field.spawn))
+        else:
+            for seg in PATH:
+                pygame.draw.rect(WIN, GRAY, seg)
         pygame.draw.rect(WIN, RED, BASE_RECT)
         
     def is_on_path_or_base(self, x, y):
@@ -398,6 +713,11 @@ class Game:
     def draw_range_preview(self, mx, my):
         if self.selected_type is None:
             return
+        if self.field is not None:
+            cell = self.field.cell_at(mx, my)
+            if cell is None:
+                return
+            mx, my = (int(v) for v in self.field.center(cell))
         rng = TOWER_TYPES[self.selected_type]["range"]
         color = (0, 255, 0, 100) if self.is_valid_placement(mx, my) else (255, 0, 0, 100)
         
@@ -408,9 +728,60 @@ class Game:
         pygame.draw.circle(WIN, TOWER_TYPES[self.selected_type]["color"], (mx, my), 20, 2)
         
     def is_valid_placement(self, x, y):
+        if self.field is not None:
+            return (self.money >= TOWER_TYPES[self.selected_type]["cost"] and
+                    self.maze_block(x, y, commit=False))
         return (self.money >= TOWER_TYPES[self.selected_type]["cost"] and 
                 not self.is_on_path_or_base(x, y) and 
                 not self.is_overlapping_tower(x, y, self.towers))
+
+    def maze_block(self, x, y, commit=True):
+        cell = self.field.cell_at(x, y)
+        if cell is None or cell == self.field.spawn or self.field.rect(cell).colliderect(BASE_RECT):
+            return False
+        occupied = set()
+        keep = {self.field.spawn}
+        for e in self.enemies:
+            occupied.add(e.cell)
+            occupied.add(e.next_cell)
+            keep.add(e.next_cell)
+        if cell in occupied:
+            return False
+        return self.field.block(cell, keep, commit)
+        
+    def tower_at(self, x, y):
+        for t in self.towers:
+            if math.hypot(t.x - x, t.y - y) <= 22:
+                return t
+        return None
+        
+    def place_tower(self, x, y):
+        cost = TOWER_TYPES[self.selected_type]["cost"]
+        if self.field is not None:
+            if self.money < cost or not self.maze_block(x, y):
+                return None
+            x, y = self.field.center(self.field.cell_at(x, y))
+        elif not self.is_valid_placement(x, y):
+            return None
+        tower = Tower(x, y, self.selected_type, self.field)
+        self.towers.append(tower)
+        self.money -= cost
+        return tower
+        
+    def upgrade_tower(self, tower):
+        cost = tower.upgrade_cost()
+        if tower.level < 3 and self.money >= cost and tower.upgrade():
+            self.money -= cost
+            return True
+        return False
+        
+    def start_wave(self):
+        if self.wave_active:
+            return False
+        self.wave += 1
+        self.wave_queue = self.generate_wave()
+        self.wave_active = True
+        return True
         
     def generate_wave(self):
         wave = []
@@ -447,10 +818,19 @@ class Game:
                     "1-3: Select tower type (Gun, Splash, Freeze)",
                     "Mouse: Place selected tower (green circle = valid placement)",
                     "U: Upgrade selected tower",
+                    "T: Cycle targeting of selected tower (First, Last, Strong, Weak, Close)",
                     "SPACE: Start next wave",
                     "ESC: Deselect tower / Return to menu",
                     "I: Toggle instructions during gameplay"
                 ]
+            },
+            {
+                "title": "MAZE MODE",
+                "content": [
+                    "There is no fixed path: enemies walk the open field towards your base.",
+                    "Each tower blocks one grid cell, so use them to build a longer maze.",
+                    "A tower that would wall the base off completely cannot be placed."
+                ]
             }
         ]
         
@@ -504,29 +884,34 @@ class Game:
         WIN.blit(subtitle, (WIDTH//2 - subtitle.get_width()//2, 180))
         
         play_btn = Button(WIDTH//2 - 100, 250, 200, 50, "Play Game", UI_LIGHT, UI_HIGHLIGHT)
-        instructions_btn = Button(WIDTH//2 - 100, 320, 200, 50, "Instructions", UI_LIGHT, UI_HIGHLIGHT)
-        quit_btn = Button(WIDTH//2 - 100, 390, 200, 50, "Quit Game", UI_LIGHT, UI_HIGHLIGHT)
+        maze_btn = Button(WIDTH//2 - 100, 320, 200, 50, "Maze Mode", UI_LIGHT, UI_HIGHLIGHT)
+        instructions_btn = Button(WIDTH//2 - 100, 390, 200, 50, "Instructions", UI_LIGHT, UI_HIGHLIGHT)
+        quit_btn = Button(WIDTH//2 - 100, 460, 200, 50, "Quit Game", UI_LIGHT, UI_HIGHLIGHT)
         
         mouse_pos = pygame.mouse.get_pos()
         play_btn.check_hover(mouse_pos)
+        maze_btn.check_hover(mouse_pos)
         instructions_btn.check_hover(mouse_pos)
         quit_btn.check_hover(mouse_pos)
         
         play_btn.draw(WIN)
+        maze_btn.draw(WIN)
         instructions_btn.draw(WIN)
         quit_btn.draw(WIN)
         
         hint = SMALL.render("Press I during gameplay to view instructions", True, WHITE)
-        WIN.blit(hint, (WIDTH//2 - hint.get_width()//2, 480))
+        WIN.blit(hint, (WIDTH//2 - hint.get_width()//2, 540))
         
-        return play_btn, instructions_btn, quit_btn
+        return play_btn, maze_btn, instructions_btn, quit_btn
         
     def update_game(self):
         if self.wave_active:
             self.spawn_timer += 1
             if self.spawn_timer >= 58 and self.wave_queue:
                 kind = self.wave_queue.pop(0)
-                self.enemies.append(Enemy(kind))
+                e = Enemy(kind, self.field)
+                self.enemies.append(e)
+                self.index.add(e)
                 self.spawn_timer = 0
             if not self.wave_queue and not self.enemies:
                 self.wave_active = False
@@ -535,14 +920,17 @@ class Game:
                 
         for e in self.enemies[:]:
             e.move()
-            if e.waypoint_index >= len(WAYPOINTS) - 1:
+            if e.reached_base():
                 self.enemies.remove(e)
+                self.index.remove(e)
                 self.base_health -= 1
                 if self.base_health <= 0:
                     self.state = STATE_GAMEOVER
+            else:
+                self.index.update(e)
                     
         for t in self.towers:
-            t.try_shoot(self.enemies, self.bullets)
+            t.try_shoot(self.index, self.bullets)
             
         for b in self.bullets[:]:
             b.update(self.enemies, self.particles)
@@ -554,6 +942,7 @@ class Game:
                 self.score += e.reward
                 self.money += e.reward // 2
                 self.enemies.remove(e)
+                self.index.remove(e)
                 
         for p in self.particles[:]:
             p.update()
@@ -578,8 +967,9 @@ class Game:
         if 36 < my < HEIGHT:
             self.draw_range_preview(mx, my)
             
+        self.target_buttons = []
         if self.selected_tower:
-            panel = pygame.Rect(10, HEIGHT - 86, 330, 76)
+            panel = pygame.Rect(10, HEIGHT - 120, 330, 110)
             pygame.draw.rect(WIN, UI_DARK, panel, border_radius=5)
             pygame.draw.rect(WIN, UI_LIGHT, panel, 2, border_radius=5)
             name = TOWER_TYPES[self.selected_tower.type]["name"]
@@ -595,8 +985,15 @@ class Game:
                 info2 = SMALL.render("Max Level Reached", True, WHITE)
             WIN.blit(info2, (panel.x + 10, panel.y + 36))
             
+            for i, mode in enumerate(TARGET_MODES):
+                color = UI_HIGHLIGHT if self.selected_tower.target_mode == mode else UI_LIGHT
+                btn = Button(panel.x + 10 + i * 63, panel.y + 70, 60, 28, TARGET_LABELS[mode], color)
+                btn.check_hover((mx, my))
+                btn.draw(WIN)
+                self.target_buttons.append((mode, btn))
+            
     def reset(self):
-        self.__init__()
+        self.__init__(self.mode)
 
 
 async def main():
@@ -612,9 +1009,15 @@ async def main():
                 running = False
                 
             if game_instance.state == STATE_MENU:
-                play_btn, instructions_btn, quit_btn = game_instance.draw_main_menu()
+                play_btn, maze_btn, instructions_btn, quit_btn = game_instance.draw_main_menu()
                 if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
                     if play_btn.is_clicked(mouse_pos, event):
+                        if game_instance.mode != MODE_PATH:
+                            game_instance = Game(MODE_PATH)
+                        game_instance.state = STATE_PLAY
+                    elif maze_btn.is_clicked(mouse_pos, event):
+                        if game_instance.mode != MODE_MAZE:
+                            game_instance = Game(MODE_MAZE)
                         game_instance.state = STATE_PLAY
                     elif instructions_btn.is_clicked(mouse_pos, event):
                         game_instance.state = STATE_INSTRUCTIONS
@@ -650,10 +1053,8 @@ async def main():
                         
             elif game_instance.state == STATE_PLAY:
                 if event.type == pygame.KEYDOWN:
-                    if event.key == pygame.K_SPACE and not game_instance.wave_active:
-                        game_instance.wave += 1
-                        game_instance.wave_queue = game_instance.generate_wave()
-                        game_instance.wave_active = True
+                    if event.key == pygame.K_SPACE:
+                        game_instance.start_wave()
                     if event.key == pygame.K_1:
                         game_instance.selected_type = "gun"
                     if event.key == pygame.K_2:
@@ -663,31 +1064,31 @@ async def main():
                     if event.key == pygame.K_ESCAPE:
                         game_instance.selected_tower = None
                     if event.key == pygame.K_u and game_instance.selected_tower:
-                        cost = game_instance.selected_tower.upgrade_cost()
-                        if game_instance.selected_tower.level < 3 and game_instance.money >= cost:
-                            if game_instance.selected_tower.upgrade():
-                                game_instance.money -= cost
+                        game_instance.upgrade_tower(game_instance.selected_tower)
+                    if event.key == pygame.K_t and game_instance.selected_tower:
+                        tower = game_instance.selected_tower
+                        i = TARGET_MODES.index(tower.target_mode)
+                        tower.target_mode = TARGET_MODES[(i + 1) % len(TARGET_MODES)]
                     if event.key == pygame.K_i:
                         game_instance.state = STATE_INSTRUCTIONS
                         game_instance.instructions_scroll = 0
                 
                 if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1:
                     mx, my = pygame.mouse.get_pos()
-                    clicked_existing = False
-                    for t in game_instance.towers:
-                        if math.hypot(t.x - mx, t.y - my) <= 22:
-                            game_instance.selected_tower = t
-                            clicked_existing = True
-                            break
+                    picked = None
+                    if game_instance.selected_tower:
+                        picked = next((mode for mode, btn in game_instance.target_buttons
+                                       if btn.is_clicked((mx, my), event)), None)
+                    if picked:
+                        game_instance.selected_tower.target_mode = picked
+                        continue
                     
-                    if clicked_existing:
+                    clicked = game_instance.tower_at(mx, my)
+                    if clicked:
+                        game_instance.selected_tower = clicked
                         continue
                     
-                    cost = TOWER_TYPES[game_instance.selected_type]["cost"]
-                    valid = game_instance.is_valid_placement(mx, my)
-                    if valid:
-                        game_instance.towers.append(Tower(mx, my, game_instance.selected_type))
-                        game_instance.money -= cost
+                    if game_instance.place_tower(mx, my):
                         game_instance.selected_tower = None
 
         if game_instance.state == STATE_MENU:
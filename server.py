@@ -0,0 +1,273 @@
+import os
+import sys
+import json
+import math
+import asyncio
+import argparse
+import itertools
+
+# The game module opens a window on import, so keep SDL headless
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+from main import Game, TOWER_TYPES, TARGET_MODES, STATE_PLAY, MODE_PATH, MODE_MAZE, WIDTH, HEIGHT
+
+HOST = "127.0.0.1"
+PORT = 8765
+TICK_RATE = 60
+# Unsent bytes a client may fall behind by before its deltas are paused
+MAX_WRITE_BUFFER = 64 * 1024
+# Ticks a paused client gets to catch up before it is disconnected
+STALL_TIMEOUT = 10 * TICK_RATE
+
+
+def valid_coord(value, limit):
+    # bool is an int subclass, and JSON lets through NaN, Infinity and huge floats
+    return (isinstance(value, (int, float)) and not isinstance(value, bool)
+            and math.isfinite(value) and 0 <= value < limit)
+
+
+def valid_id(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+class Session:
+    """One independent Game driven by a single client connection.
+
+    Every tick the client gets a delta against the last state it was sent:
+      n: new entities   [id, tag, kind, x, y, *extra]
+      u: changes        [id, dx, dy] plus the extra fields when they changed
+      r: removed ids
+      s: [money, base, wave, score, wave_active, state] when any changed
+      f: present when the message replaces everything the client holds
+    Positions are quantized to whole pixels and sent relative to the last
+    position the client has, so a moving enemy usually costs a few bytes.
+
+    A client that stops reading has its deltas paused once it is
+    MAX_WRITE_BUFFER bytes behind. When its buffer drains it is sent a full
+    snapshot; if that takes longer than STALL_TIMEOUT ticks it is dropped.
+    """
+
+    def __init__(self, session_id, writer, mode=MODE_PATH):
+        self.id = session_id
+        self.writer = writer
+        self.tick = 0
+        self.bytes_sent = 0
+        self.stalled_ticks = 0
+        self.new_game(mode)
+
+    def new_game(self, mode):
+        self.game = Game(mode)
+        self.game.state = STATE_PLAY
+        self.ids = itertools.count(1)
+        self.sent = {}
+        self.stats = None
+
+    def net_id(self, obj):
+        nid = getattr(obj, "net_id", None)
+        if nid is None:
+            nid = obj.net_id = next(self.ids)
+        return nid
+
+    def snapshot(self):
+        rows = {}
+        for e in self.game.enemies:
+            rows[self.net_id(e)] = ("e", e.kind, round(e.x), round(e.y), max(0, round(e.health)))
+        for t in self.game.towers:
+            rows[self.net_id(t)] = ("t", t.type, round(t.x), round(t.y), t.level, t.target_mode)
+        for b in self.game.bullets:
+            rows[self.net_id(b)] = ("b", b.tower_type, round(b.x), round(b.y))
+        return rows
+
+    def delta(self):
+        rows = self.snapshot()
+        new, changed = [], []
+        for nid, row in rows.items():
+            prev = self.sent.get(nid)
+            if prev is None:
+                new.append([nid, *row])
+            elif prev != row:
+                entry = [nid, row[2] - prev[2], row[3] - prev[3]]
+                if row[4:] != prev[4:]:
+                    entry.extend(row[4:])
+                changed.append(entry)
+        removed = [nid for nid in self.sent if nid not in rows]
+        self.sent = rows
+
+        g = self.game
+        stats = [g.money, g.base_health, g.wave, g.score, g.wave_active, g.state]
+        msg = {"t": self.tick}
+        if new:
+            msg["n"] = new
+        if changed:
+            msg["u"] = changed
+        if removed:
+            msg["r"] = removed
+        if stats != self.stats:
+            msg["s"] = stats
+            self.stats = stats
+        return msg if len(msg) > 1 else None
+
+    def step(self):
+        if self.game.state == STATE_PLAY:
+            self.game.update_game()
+        self.tick += 1
+
+        transport = self.writer.transport
+        if transport.is_closing():
+            return
+        buffered = transport.get_write_buffer_size()
+        if self.stalled_ticks:
+            if buffered:
+                self.stalled_ticks += 1
+                if self.stalled_ticks > STALL_TIMEOUT:
+                    # abort() rather than close(), which would wait on the unread buffer
+                    transport.abort()
+                return
+            self.stalled_ticks = 0
+            self.sent = {}
+            self.stats = None
+            msg = self.delta()
+            msg["f"] = 1
+            self.send(msg)
+            return
+        if buffered > MAX_WRITE_BUFFER:
+            self.stalled_ticks = 1
+            return
+
+        msg = self.delta()
+        if msg:
+            self.send(msg)
+
+    def send(self, msg):
+        if self.stalled_ticks:
+            return
+        data = (json.dumps(msg, separators=(",", ":")) + "\n").encode()
+        self.writer.write(data)
+        self.bytes_sent += len(data)
+
+    def handle(self, line):
+        try:
+            cmd = json.loads(line)
+            name = cmd["cmd"]
+        except (ValueError, TypeError, KeyError):
+            self.send({"error": "bad command"})
+            return
+        if not isinstance(name, str):
+            self.send({"error": "bad command"})
+            return
+
+        # Every field is client-supplied JSON, so check its type before using it
+        g = self.game
+        if name == "place":
+            tower_type = cmd.get("type", "gun")
+            if not isinstance(tower_type, str) or tower_type not in TOWER_TYPES:
+                self.send({"error": "unknown tower type"})
+                return
+            x, y = cmd.get("x"), cmd.get("y")
+            if not valid_coord(x, WIDTH) or not valid_coord(y, HEIGHT):
+                self.send({"error": "invalid placement"})
+                return
+            g.selected_type = tower_type
+            if g.state != STATE_PLAY or not g.place_tower(x, y):
+                self.send({"error": "invalid placement"})
+        elif name == "upgrade":
+            tower = self.tower_by_id(cmd.get("id"))
+            if tower is None or not g.upgrade_tower(tower):
+                self.send({"error": "cannot upgrade"})
+        elif name == "target":
+            tower = self.tower_by_id(cmd.get("id"))
+            mode = cmd.get("mode")
+            if tower is None or not isinstance(mode, str) or mode not in TARGET_MODES:
+                self.send({"error": "cannot set targeting"})
+            else:
+                tower.target_mode = mode
+        elif name == "start_wave":
+            if g.state != STATE_PLAY or not g.start_wave():
+                self.send({"error": "wave already active"})
+        elif name == "reset":
+            mode = cmd.get("mode", g.mode)
+            if not isinstance(mode, str) or mode not in (MODE_PATH, MODE_MAZE):
+                self.send({"error": "unknown mode"})
+                return
+            # Removing everything the client holds keeps the delta stream consistent
+            removed = list(self.sent)
+            self.new_game(mode)
+            self.send({"t": self.tick, "r": removed})
+        else:
+            self.send({"error": "unknown command"})
+
+    def tower_by_id(self, nid):
+        if not valid_id(nid):
+            return None
+        return next((t for t in self.game.towers if getattr(t, "net_id", None) == nid), None)
+
+
+class GameServer:
+    def __init__(self, tick_rate=TICK_RATE):
+        self.tick_rate = tick_rate
+        self.sessions = {}
+        self.session_ids = itertools.count(1)
+        self.ticks = 0
+        self.overruns = 0
+        self.busy_time = 0.0
+
+    async def handle_client(self, reader, writer):
+        session = Session(next(self.session_ids), writer)
+        self.sessions[session.id] = session
+        session.send({"session": session.id, "tick_rate": self.tick_rate})
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                session.handle(line)
+        except ValueError:
+            # readline() raises this for a line over the stream limit; the stream can't resync
+            session.send({"error": "command too long"})
+        except ConnectionError:
+            pass
+        finally:
+            del self.sessions[session.id]
+            writer.close()
+
+    async def run_ticks(self):
+        loop = asyncio.get_running_loop()
+        period = 1 / self.tick_rate
+        next_tick = loop.time()
+        while True:
+            start = loop.time()
+            for session in list(self.sessions.values()):
+                session.step()
+            now = loop.time()
+            self.busy_time += now - start
+            self.ticks += 1
+
+            next_tick += period
+            if next_tick < now:
+                # Drop missed ticks instead of bursting to catch up
+                self.overruns += 1
+                next_tick = now
+            await asyncio.sleep(next_tick - now)
+
+    async def serve(self, host=HOST, port=PORT):
+        server = await asyncio.start_server(self.handle_client, host, port)
+        print(f"Serving Tower Defense sessions on {host}:{port} at {self.tick_rate} Hz")
+        async with server:
+            await self.run_ticks()
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Headless multi-session Tower Defense server")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--tick-rate", type=int, default=TICK_RATE)
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args(sys.argv[1:])
+    try:
+        asyncio.run(GameServer(args.tick_rate).serve(args.host, args.port))
+    except KeyboardInterrupt:
+        pass